@@ -1,6 +1,10 @@
+import os
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
 
 # =====================================================
 # PAGE CONFIG
@@ -26,7 +30,14 @@ powerbi_colors = [
 ]
 
 px.defaults.color_discrete_sequence = powerbi_colors
-px.defaults.template = "plotly_white"
+# Power BI palette layered over plotly_white for every figure.
+pio.templates["showroom"] = go.layout.Template(layout=dict(colorway=powerbi_colors))
+pio.templates.default = "plotly_white+showroom"
+
+# Background and font go on each figure's own layout: st.plotly_chart's
+# default Streamlit theme overrides these keys when they only live in the
+# template.
+SHOWROOM_LAYOUT = dict(plot_bgcolor='#f7f9fc', paper_bgcolor='#f7f9fc', font=dict(color='#374649'))
 
 # =====================================================
 # CUSTOM CSS FOR INTERACTIVE DASHBOARD
@@ -93,30 +104,242 @@ st.title("🚗 Car Showroom Sales Dashboard")
 # =====================================================
 # LOAD DATA
 # =====================================================
-@st.cache_data
-def load_data():
-    df = pd.read_csv("car_showroom_data.csv")
+DATA_CSV = "car_showroom_data.csv"
+# Bump whenever read_sales_csv changes what it writes: the version is part of
+# the file name, so existing copies are ignored and rebuilt automatically.
+PARQUET_SCHEMA_VERSION = 2
+DATA_PARQUET = f"car_showroom_data.v{PARQUET_SCHEMA_VERSION}.parquet"
+MONTH_ORDER = ("Jan","Feb","Mar","Apr","May","Jun","Jul","Aug","Sep","Oct","Nov","Dec")
+
+def read_sales_csv():
+    # Parse dates and derive the calendar and categorical columns. The result
+    # is cached as Parquet so later loads read typed columnar data instead.
+    df = pd.read_csv(DATA_CSV)
     df["SaleDate"] = pd.to_datetime(df["SaleDate"])
     df["Year"] = df["SaleDate"].dt.year.astype(str)
     df["Month"] = df["SaleDate"].dt.month
-    df["MonthName"] = df["SaleDate"].dt.strftime("%b")
+    df["MonthName"] = pd.Categorical.from_codes(df["Month"].to_numpy() - 1, categories=MONTH_ORDER, ordered=True)
+
+    # Low-cardinality keys as categoricals: isin/groupby compare integer
+    # codes instead of hashing strings, and the frame shrinks considerably.
+    for c in ("City","FuelType","CarModel","SalesPersonID","Year"):
+        df[c] = df[c].astype("category")
+
+    # Prices are whole rupees, so int32 halves the bytes every sum reads;
+    # pandas still accumulates the sums in int64.
+    downcast = "integer" if pd.api.types.is_integer_dtype(df["Price"]) else "float"
+    df["Price"] = pd.to_numeric(df["Price"], downcast=downcast)
     return df
 
-df = load_data()
+def write_parquet(df):
+    # Write to a temporary file and rename it into place, so an interrupted
+    # or concurrent build never leaves a truncated DATA_PARQUET behind.
+    tmp_path = f"{DATA_PARQUET}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, DATA_PARQUET)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+@st.cache_data
+def load_data():
+    if os.path.exists(DATA_PARQUET) and os.path.getmtime(DATA_PARQUET) >= os.path.getmtime(DATA_CSV):
+        df = pd.read_parquet(DATA_PARQUET)
+        # Parquet restores string categoricals but reads integer ones back as ints.
+        df["SalesPersonID"] = df["SalesPersonID"].astype("category")
+    else:
+        df = read_sales_csv()
+        try:
+            write_parquet(df)
+        except OSError:
+            # Read-only directory or full disk: serve from the CSV this time.
+            pass
+
+    # Long-format pre-aggregate with unit and revenue totals per group. The
+    # tabs filter and re-aggregate this table instead of the raw sales rows.
+    # dropna=False keeps sales with a missing key in the KPI totals.
+    agg = df.groupby(
+        ["Year","City","FuelType","CarModel","SalesPersonID","MonthName"], observed=True, dropna=False
+    ).agg(
+        Sales=("Price","size"),
+        Revenue=("Price","sum")
+    ).reset_index()
+
+    # Sidebar options, sorted once per load rather than on every rerun.
+    uniques = {c: sorted(df[c].unique()) for c in ("Year","City","FuelType")}
+    return agg, uniques
+
+agg, UNIQUES = load_data()
 
 # =====================================================
 # SIDEBAR FILTERS
 # =====================================================
 st.sidebar.header("🎛 Filters")
-year = st.sidebar.multiselect("Year", sorted(df["Year"].unique()), default=sorted(df["Year"].unique()))
-city = st.sidebar.multiselect("City", sorted(df["City"].unique()), default=sorted(df["City"].unique()))
-fuel = st.sidebar.multiselect("Fuel Type", sorted(df["FuelType"].unique()), default=sorted(df["FuelType"].unique()))
-
-filtered_df = df[
-    (df["Year"].isin(year)) &
-    (df["City"].isin(city)) &
-    (df["FuelType"].isin(fuel))
-]
+year = st.sidebar.multiselect("Year", UNIQUES["Year"], default=UNIQUES["Year"])
+city = st.sidebar.multiselect("City", UNIQUES["City"], default=UNIQUES["City"])
+fuel = st.sidebar.multiselect("Fuel Type", UNIQUES["FuelType"], default=UNIQUES["FuelType"])
+
+# =====================================================
+# CACHED FILTERING & AGGREGATIONS
+# =====================================================
+# Each helper is keyed on the sorted (years, cities, fuels) selection, so a
+# filter state seen before is a cache lookup instead of a rescan of agg.
+# Entries are bounded like the figure caches below. The filtered frame is
+# only read by the helpers, so it is shared via cache_resource rather than
+# pickled and unpickled on every downstream cache miss.
+@st.cache_resource(max_entries=64)
+def get_filtered(years, cities, fuels):
+    # Everything selected (the default state): no mask needed.
+    if (len(years) == len(UNIQUES["Year"]) and len(cities) == len(UNIQUES["City"])
+            and len(fuels) == len(UNIQUES["FuelType"])):
+        return agg
+    # Match on the integer category codes so the mask is one pass over
+    # contiguous int arrays rather than three string-hashing isin calls.
+    mask = np.logical_and.reduce([
+        np.isin(agg[col].cat.codes.to_numpy(), agg[col].cat.categories.get_indexer(list(selected)))
+        for col, selected in (("Year", years), ("City", cities), ("FuelType", fuels))
+    ])
+    return agg[mask]
+
+@st.cache_data(max_entries=64)
+def get_kpis(years, cities, fuels):
+    filtered_agg = get_filtered(years, cities, fuels)
+    # One reduction over both columns; avoid 0/0 when the selection is empty.
+    sales, revenue = filtered_agg[["Sales","Revenue"]].sum()
+    return sales, revenue, revenue / sales if sales else 0
+
+@st.cache_data(max_entries=64)
+def get_yearly_sales(years, cities, fuels):
+    filtered_agg = get_filtered(years, cities, fuels)
+    return filtered_agg.groupby("Year", observed=True)["Sales"].sum().reset_index()
+
+@st.cache_data(max_entries=64)
+def get_monthly_sales(years, cities, fuels):
+    filtered_agg = get_filtered(years, cities, fuels)
+    return filtered_agg.groupby(["Year","MonthName"], observed=True)["Sales"].sum().reset_index()
+
+@st.cache_data(max_entries=64)
+def get_city_summary(years, cities, fuels):
+    filtered_agg = get_filtered(years, cities, fuels)
+    city_summary = filtered_agg.groupby("City", observed=True).agg(
+        Sales=("Sales","sum"),
+        Revenue=("Revenue","sum")
+    ).reset_index()
+    city_summary["Avg_Price"] = city_summary["Revenue"] / city_summary["Sales"]
+    return city_summary
+
+@st.cache_data(max_entries=64)
+def get_model_perf(years, cities, fuels):
+    filtered_agg = get_filtered(years, cities, fuels)
+    return filtered_agg.groupby("CarModel", observed=True).agg(
+        Units_Sold=("Sales","sum"),
+        Revenue=("Revenue","sum")
+    ).reset_index()
+
+@st.cache_data(max_entries=64)
+def get_fuel_stats(years, cities, fuels):
+    filtered_agg = get_filtered(years, cities, fuels)
+    return filtered_agg.groupby("FuelType", observed=True).agg(
+        Count=("Sales","sum"),
+        Revenue=("Revenue","sum")
+    ).reset_index()
+
+@st.cache_data(max_entries=64)
+def get_sales_perf(years, cities, fuels):
+    filtered_agg = get_filtered(years, cities, fuels)
+    return filtered_agg.groupby("SalesPersonID", observed=True).agg(
+        Cars_Sold=("Sales","sum"),
+        Revenue=("Revenue","sum")
+    ).reset_index()
+
+@st.cache_data(max_entries=64)
+def get_cross_tab(years, cities, fuels):
+    filtered_agg = get_filtered(years, cities, fuels)
+    return filtered_agg.groupby(["City","FuelType"], observed=True)["Sales"].sum().unstack(fill_value=0)
+
+# =====================================================
+# CACHED FIGURES
+# =====================================================
+# Figures are built once per filter selection and shared across reruns and
+# sessions. They are only ever read after construction, so cache_resource
+# can hand out the same object without copying it. Charts over the small
+# aggregate frames use graph_objects directly, skipping plotly.express'
+# per-call dataframe processing.
+@st.cache_resource(max_entries=64)
+def build_yearly_fig(years, cities, fuels):
+    yearly_sales = get_yearly_sales(years, cities, fuels)
+    fig = go.Figure(go.Scatter(
+        x=yearly_sales["Year"].to_numpy(), y=yearly_sales["Sales"].to_numpy(), mode="lines+markers"
+    ), layout=SHOWROOM_LAYOUT)
+    fig.update_layout(title="Year-wise Sales", xaxis_title="Year", yaxis_title="Sales")
+    return fig
+
+@st.cache_resource(max_entries=64)
+def build_monthly_fig(years, cities, fuels):
+    monthly_sales = get_monthly_sales(years, cities, fuels)
+    fig = go.Figure(layout=SHOWROOM_LAYOUT)
+    for yr, sales in monthly_sales.groupby("Year", observed=True):
+        fig.add_trace(go.Bar(x=sales["MonthName"].to_numpy(), y=sales["Sales"].to_numpy(), name=yr))
+    fig.update_layout(
+        title="Month-wise Sales", xaxis_title="MonthName", yaxis_title="Sales", legend_title="Year",
+        barmode="relative", xaxis=dict(categoryorder="array", categoryarray=MONTH_ORDER)
+    )
+    return fig
+
+@st.cache_resource(max_entries=64)
+def build_city_fig(years, cities, fuels):
+    city_summary = get_city_summary(years, cities, fuels)
+    fig = go.Figure(go.Bar(
+        x=city_summary["City"].to_numpy(), y=city_summary["Revenue"].to_numpy(), texttemplate="%{y}"
+    ), layout=SHOWROOM_LAYOUT)
+    fig.update_layout(xaxis_title="City", yaxis_title="Revenue")
+    return fig
+
+@st.cache_resource(max_entries=64)
+def build_model_fig(years, cities, fuels):
+    top_models = get_model_perf(years, cities, fuels).nlargest(10, "Revenue")
+    fig = go.Figure(go.Bar(
+        x=top_models["Revenue"].to_numpy(), y=top_models["CarModel"].to_numpy(), orientation="h",
+        texttemplate="%{x}"
+    ), layout=SHOWROOM_LAYOUT)
+    fig.update_layout(xaxis_title="Revenue", yaxis_title="CarModel")
+    return fig
+
+@st.cache_resource(max_entries=64)
+def build_fuel_pie_fig(years, cities, fuels):
+    fuel_stats = get_fuel_stats(years, cities, fuels)
+    return go.Figure(go.Pie(
+        labels=fuel_stats["FuelType"].to_numpy(), values=fuel_stats["Count"].to_numpy(), hole=0.45
+    ), layout=SHOWROOM_LAYOUT)
+
+@st.cache_resource(max_entries=64)
+def build_fuel_revenue_fig(years, cities, fuels):
+    fuel_stats = get_fuel_stats(years, cities, fuels)
+    fig = go.Figure(go.Bar(
+        x=fuel_stats["FuelType"].to_numpy(), y=fuel_stats["Revenue"].to_numpy(), texttemplate="%{y}"
+    ), layout=SHOWROOM_LAYOUT)
+    fig.update_layout(xaxis_title="FuelType", yaxis_title="Revenue")
+    return fig
+
+@st.cache_resource(max_entries=64)
+def build_sales_fig(years, cities, fuels):
+    top_sellers = get_sales_perf(years, cities, fuels).nlargest(10, "Revenue")
+    fig = go.Figure(go.Bar(
+        x=top_sellers["SalesPersonID"].to_numpy(), y=top_sellers["Revenue"].to_numpy(), texttemplate="%{y}"
+    ), layout=SHOWROOM_LAYOUT)
+    fig.update_layout(xaxis_title="SalesPersonID", yaxis_title="Revenue")
+    return fig
+
+@st.cache_resource(max_entries=64)
+def build_cross_fig(years, cities, fuels):
+    cross_df = get_cross_tab(years, cities, fuels)
+    fig = px.imshow(cross_df, text_auto=True, color_continuous_scale=px.colors.sequential.Plasma)
+    fig.update_layout(SHOWROOM_LAYOUT)
+    return fig
+
+filters = (tuple(sorted(year)), tuple(sorted(city)), tuple(sorted(fuel)))
+cars_sold, total_revenue, avg_price = get_kpis(*filters)
 
 # =====================================================
 # KPI CARDS (3 COLUMNS) WITH INTERACTIVE COLORS
@@ -126,21 +349,21 @@ k1, k2, k3 = st.columns(3)
 k1.markdown(f"""
 <div class="kpi-card-1">
 <h3>🚘 Cars Sold</h3>
-<h2>{filtered_df.shape[0]:,}</h2>
+<h2>{cars_sold:,}</h2>
 </div>
 """, unsafe_allow_html=True)
 
 k2.markdown(f"""
 <div class="kpi-card-2">
 <h3>💰 Total Revenue</h3>
-<h2>₹ {filtered_df['Price'].sum():,.0f}</h2>
+<h2>₹ {total_revenue:,.0f}</h2>
 </div>
 """, unsafe_allow_html=True)
 
 k3.markdown(f"""
 <div class="kpi-card-3">
 <h3>📊 Avg Price</h3>
-<h2>₹ {filtered_df['Price'].mean():,.0f}</h2>
+<h2>₹ {avg_price:,.0f}</h2>
 </div>
 """, unsafe_allow_html=True)
 
@@ -153,79 +376,66 @@ st.subheader("📈 Sales Trend Analysis")
 c1, c2 = st.columns(2)
 
 with c1:
-    yearly_sales = filtered_df.groupby("Year").size().reset_index(name="Sales")
-    fig = px.line(yearly_sales, x="Year", y="Sales", markers=True, title="Year-wise Sales")
-    fig.update_layout(plot_bgcolor='#f7f9fc', paper_bgcolor='#f7f9fc', font_color='#374649')
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(build_yearly_fig(*filters), width="stretch", key="yearly_sales")
 
 with c2:
-    monthly_sales = filtered_df.groupby(["Year","MonthName"]).size().reset_index(name="Sales")
-    month_order = ["Jan","Feb","Mar","Apr","May","Jun","Jul","Aug","Sep","Oct","Nov","Dec"]
-    monthly_sales["MonthName"] = pd.Categorical(monthly_sales["MonthName"], categories=month_order, ordered=True)
-    fig = px.bar(monthly_sales, x="MonthName", y="Sales", color="Year", title="Month-wise Sales")
-    fig.update_layout(plot_bgcolor='#f7f9fc', paper_bgcolor='#f7f9fc', font_color='#374649')
-    st.plotly_chart(fig, use_container_width=True)
+    st.plotly_chart(build_monthly_fig(*filters), width="stretch", key="monthly_sales")
 
 # =====================================================
 # TABS
 # =====================================================
+# Tabs track the selected tab and rerun on switch, so only the open tab runs
+# its aggregations and builds its figures; hidden tabs are skipped.
+def render_city_tab(years, cities, fuels):
+    st.plotly_chart(build_city_fig(years, cities, fuels), width="stretch", key="city_rev")
+    st.dataframe(get_city_summary(years, cities, fuels), width="stretch")
+
+def render_product_tab(years, cities, fuels):
+    st.plotly_chart(build_model_fig(years, cities, fuels), width="stretch", key="model_top10")
+    st.dataframe(get_model_perf(years, cities, fuels).nlargest(100, "Revenue"), width="stretch")
+
+def render_fuel_tab(years, cities, fuels):
+    c1, c2 = st.columns(2)
+    with c1:
+        st.plotly_chart(build_fuel_pie_fig(years, cities, fuels), width="stretch", key="fuel_pie")
+    with c2:
+        st.plotly_chart(build_fuel_revenue_fig(years, cities, fuels), width="stretch", key="fuel_rev")
+
+def render_salesperson_tab(years, cities, fuels):
+    st.plotly_chart(build_sales_fig(years, cities, fuels), width="stretch", key="sales_top10")
+    st.dataframe(get_sales_perf(years, cities, fuels).nlargest(100, "Revenue"), width="stretch")
+
+def render_cross_tab(years, cities, fuels):
+    st.plotly_chart(build_cross_fig(years, cities, fuels), width="stretch", key="cross_heatmap")
+
 tab1, tab2, tab3, tab4, tab5 = st.tabs([
     "🏙 City", "🚘 Product", "⛽ Fuel", "🧑‍💼 Salesperson", "🔥 Cross Analysis"
-])
+], key="active_tab", on_change="rerun")
 
 # TAB 1: CITY
 with tab1:
-    city_summary = filtered_df.groupby("City").agg(
-        Sales=("Price","count"),
-        Revenue=("Price","sum"),
-        Avg_Price=("Price","mean")
-    ).reset_index()
-    fig = px.bar(city_summary, x="City", y="Revenue", text_auto=True, color_discrete_sequence=powerbi_colors)
-    fig.update_layout(plot_bgcolor='#f7f9fc', paper_bgcolor='#f7f9fc', font_color='#374649')
-    st.plotly_chart(fig, use_container_width=True)
-    st.dataframe(city_summary, use_container_width=True)
+    if tab1.open:
+        render_city_tab(*filters)
 
 # TAB 2: PRODUCT
 with tab2:
-    model_perf = filtered_df.groupby("CarModel").agg(
-        Units_Sold=("Price","count"),
-        Revenue=("Price","sum")
-    ).reset_index().sort_values("Revenue", ascending=False)
-    fig = px.bar(model_perf.head(10), y="CarModel", x="Revenue", orientation="h",
-                 text_auto=True, color_discrete_sequence=powerbi_colors)
-    fig.update_layout(plot_bgcolor='#f7f9fc', paper_bgcolor='#f7f9fc', font_color='#374649')
-    st.plotly_chart(fig, use_container_width=True)
-    st.dataframe(model_perf, use_container_width=True)
+    if tab2.open:
+        render_product_tab(*filters)
 
 # TAB 3: FUEL
 with tab3:
-    fuel_count = filtered_df["FuelType"].value_counts().reset_index()
-    fuel_count.columns = ["FuelType","Count"]
-    c1, c2 = st.columns(2)
-    with c1:
-        fig = px.pie(fuel_count, names="FuelType", values="Count", hole=0.45, color_discrete_sequence=powerbi_colors)
-        st.plotly_chart(fig, use_container_width=True)
-    with c2:
-        fuel_revenue = filtered_df.groupby("FuelType")["Price"].sum().reset_index()
-        fig = px.bar(fuel_revenue, x="FuelType", y="Price", text_auto=True, color_discrete_sequence=powerbi_colors)
-        st.plotly_chart(fig, use_container_width=True)
+    if tab3.open:
+        render_fuel_tab(*filters)
 
 # TAB 4: SALESPERSON
 with tab4:
-    sales_perf = filtered_df.groupby("SalesPersonID").agg(
-        Cars_Sold=("Price","count"),
-        Revenue=("Price","sum")
-    ).reset_index().sort_values("Revenue", ascending=False)
-    fig = px.bar(sales_perf.head(10), x="SalesPersonID", y="Revenue",
-                 text_auto=True, color_discrete_sequence=powerbi_colors)
-    st.plotly_chart(fig, use_container_width=True)
-    st.dataframe(sales_perf, use_container_width=True)
+    if tab4.open:
+        render_salesperson_tab(*filters)
 
 # TAB 5: CROSS ANALYSIS
 with tab5:
-    cross_df = pd.crosstab(filtered_df["City"], filtered_df["FuelType"])
-    fig = px.imshow(cross_df, text_auto=True, color_continuous_scale=px.colors.sequential.Plasma)
-    st.plotly_chart(fig, use_container_width=True)
+    if tab5.open:
+        render_cross_tab(*filters)
 
 # FOOTER
 st.markdown("---")